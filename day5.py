@@ -62,12 +62,17 @@ You still need to determine the number of points where at least two lines overla
 Consider all of the lines. At how many points do at least two lines overlap?
 
 """
-from collections import namedtuple
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 import numpy as np
 from operator import xor
-import matplotlib.pyplot as plt
+import os
+from visualization import render
 
 LineSegmentTuple = namedtuple('LineSegment', ['x1', 'y1', 'x2', 'y2'])
+MAX_DENSE_CELLS = 10**8
 
 class LineSegment:
     def __init__(self, line, mask_shape = (1000, 1000)):
@@ -97,24 +102,509 @@ class LineSegment:
     def __repr__(self):
         return f'{self.line} | ({self.x1}, {self.y1}), ({self.x2}, {self.y2})'
 
-# def parse_line(line:str):
-#     coords = np.fromstring(line.replace(' -> ', ','), sep=',', dtype=int)
-#     return LineSegmentTuple(*coords)
-
-def show_field(field, title=''):
-    fig = plt.imshow(field)
-    plt.title(title)
-    plt.show()
-
-def part_1(lines):
-    line_segments = [LineSegment(line) for line in lines]
-    valid_line_segments = []
-    [valid_line_segments.append(ls) for ls in line_segments if ((ls.delta_x)==0 or (ls.delta_y==0))]
-    field = np.zeros((1000, 1000))
-    for ls in valid_line_segments:
-        field[ls.x_coords, ls.y_coords] += 1
-    show_field(field, 'part1')
-    print(np.sum(field >= 2))
+def parse_line(line: str) -> LineSegmentTuple:
+    coords = line.strip().replace(' -> ', ',').split(',')
+    return LineSegmentTuple(*[int(c) for c in coords])
+
+
+# Every horizontal, vertical or 45 degree segment lies on a line of one of four families. Each line is identified by a
+# key and points along it by a parameter:
+#   'h': y = key, param x     'v': x = key, param y     'd': x - y = key, param x     'a': x + y = key, param x
+LINE_FAMILIES = ('h', 'v', 'd', 'a')
+
+
+def classify_segment(ls: LineSegmentTuple) -> (str, int, int, int):
+    """ Return (family, key, lo, hi) for a segment, where lo..hi is the inclusive parameter range it covers """
+    if ls.y1 == ls.y2:
+        return 'h', ls.y1, min(ls.x1, ls.x2), max(ls.x1, ls.x2)
+    if ls.x1 == ls.x2:
+        return 'v', ls.x1, min(ls.y1, ls.y2), max(ls.y1, ls.y2)
+    if ls.x2 - ls.x1 == ls.y2 - ls.y1:
+        return 'd', ls.x1 - ls.y1, min(ls.x1, ls.x2), max(ls.x1, ls.x2)
+    if ls.x2 - ls.x1 == ls.y1 - ls.y2:
+        return 'a', ls.x1 + ls.y1, min(ls.x1, ls.x2), max(ls.x1, ls.x2)
+    raise ValueError(f'segment {ls} is not horizontal, vertical or diagonal at 45 degrees')
+
+
+def line_intersection(family_1: str, key_1: int, family_2: str, key_2: int):
+    """ Return the integer point where two lines of different families cross, or None if they cross between points """
+    lines = {family_1: key_1, family_2: key_2}
+    if 'h' in lines and 'v' in lines:
+        return lines['v'], lines['h']
+    if 'h' in lines:
+        y = lines['h']
+        return (lines['d'] + y, y) if 'd' in lines else (lines['a'] - y, y)
+    if 'v' in lines:
+        x = lines['v']
+        return (x, x - lines['d']) if 'd' in lines else (x, lines['a'] - x)
+    if (lines['d'] + lines['a']) % 2:
+        return None
+    x = (lines['d'] + lines['a']) // 2
+    return x, x - lines['d']
+
+
+def point_at(family: str, key: int, param: int) -> (int, int):
+    return {'h': (param, key), 'v': (key, param), 'd': (param, param - key), 'a': (param, key - param)}[family]
+
+
+def key_on_line(family: str, x: int, y: int) -> int:
+    return {'h': y, 'v': x, 'd': x - y, 'a': x + y}[family]
+
+
+def param_on_line(family: str, x: int, y: int) -> int:
+    return y if family == 'v' else x
+
+
+def sweep_intervals(intervals: list[(int, int)]) -> (list[(int, int)], list[(int, int)]):
+    """
+    Sweep the inclusive intervals lying on one line and return the merged intervals covered at least once and the
+    merged intervals covered at least twice.
+    """
+    changes = Counter()
+    for lo, hi in intervals:
+        changes[lo] += 1
+        changes[hi + 1] -= 1
+    covered, overlapped = [], []
+    depth = 0
+    for position in sorted(changes):
+        previous_depth = depth
+        depth += changes[position]
+        for threshold, spans in ((1, covered), (2, overlapped)):
+            if previous_depth < threshold <= depth:
+                spans.append((position, None))
+            elif depth < threshold <= previous_depth:
+                spans[-1] = (spans[-1][0], position - 1)
+    return covered, overlapped
+
+
+def interval_containing(spans: list[(int, int)], starts: list[int], value: int) -> bool:
+    i = bisect_right(starts, value) - 1
+    return i >= 0 and spans[i][1] >= value
+
+
+def cross_key_range(family: str, key: int, lo: int, hi: int, other_family: str) -> (int, int):
+    """ Range of the keys of other_family lines met along the span lo..hi of a line, monotonic along the span """
+    first = key_on_line(other_family, *point_at(family, key, lo))
+    last = key_on_line(other_family, *point_at(family, key, hi))
+    return min(first, last), max(first, last)
+
+
+def fenwick_add(tree: list[int], index: int, delta: int):
+    index += 1
+    while index < len(tree):
+        tree[index] += delta
+        index += index & -index
+
+
+def fenwick_prefix(tree: list[int], index: int) -> int:
+    """ Sum of the first index entries """
+    total = 0
+    while index:
+        total += tree[index]
+        index -= index & -index
+    return total
+
+
+def fenwick_select(tree: list[int], rank: int) -> int:
+    """ Index of the entry holding the rank-th (from 0) unit of the running sum """
+    index = 0
+    step = 1 << (len(tree).bit_length() - 1)
+    while step:
+        if index + step < len(tree) and tree[index + step] <= rank:
+            index += step
+            rank -= tree[index]
+        step >>= 1
+    return index
+
+
+def sweep_crossings(rows: list[(int, int, int)], columns: list[(int, int, int)]):
+    """
+    Yield every (row, column) where a row span meets a column span, in O((N + crossings) log N).
+
+    Rows are (row, column_lo, column_hi) and columns are (column, row_lo, row_hi). The sweep runs along the columns,
+    keeping the rows whose span is active in a Fenwick tree over the sorted row keys, so every column is answered by
+    walking only the active rows inside its range.
+
+    :arg rows: spans of constant row key
+    :arg columns: spans of constant column key
+    """
+    row_keys = sorted({row for row, _, _ in rows})
+    row_index = {row: i for i, row in enumerate(row_keys)}
+    tree = [0] * (len(row_keys) + 1)
+    # at equal columns rows are inserted (0) before columns are answered (1) before rows are removed (2)
+    events = [(column_lo, 0, row_index[row]) for row, column_lo, _ in rows]
+    events += [(column_hi, 2, row_index[row]) for row, _, column_hi in rows]
+    events += [(column, 1, i) for i, (column, _, _) in enumerate(columns)]
+    events.sort()
+    for column, kind, i in events:
+        if kind == 0:
+            fenwick_add(tree, i, 1)
+        elif kind == 2:
+            fenwick_add(tree, i, -1)
+        else:
+            _, row_lo, row_hi = columns[i]
+            first_rank = fenwick_prefix(tree, bisect_left(row_keys, row_lo))
+            last_rank = fenwick_prefix(tree, bisect_right(row_keys, row_hi))
+            for rank in range(first_rank, last_rank):
+                yield row_keys[fenwick_select(tree, rank)], column
+
+
+def count_overlaps(line_segments, include_diagonals: bool = True) -> int:
+    """
+    Count the points covered by at least two line segments without rasterizing a field.
+
+    Collinear segments are swept per line to find the spans covered by two or more segments. Segments on lines of
+    different families can only share single crossing points, which are found for each pair of families by a sweep
+    over the key of one family (see sweep_crossings). Memory is proportional to the number of segments plus the number
+    of crossing points, independent of the size of the plane.
+
+    :arg line_segments: iterable of LineSegmentTuple
+    :arg include_diagonals: count 45 degree segments as well as horizontal and vertical ones (part 2)
+    """
+    lines = {family: defaultdict(list) for family in LINE_FAMILIES}
+    for ls in line_segments:
+        family, key, lo, hi = classify_segment(ls)
+        if include_diagonals or family in 'hv':
+            lines[family][key].append((lo, hi))
+
+    covered = {family: {} for family in LINE_FAMILIES}
+    overlapped = {family: {} for family in LINE_FAMILIES}
+    for family in LINE_FAMILIES:
+        for key, intervals in lines[family].items():
+            covered[family][key], overlapped[family][key] = sweep_intervals(intervals)
+    overlapped_starts = {family: {key: [lo for lo, hi in spans] for key, spans in overlapped[family].items()}
+                         for family in LINE_FAMILIES}
+
+    # points where lines of two different families are both covered
+    crossings = set()
+    for i, family_1 in enumerate(LINE_FAMILIES):
+        for family_2 in LINE_FAMILIES[i + 1:]:
+            rows = [(key, *cross_key_range(family_1, key, lo, hi, family_2))
+                    for key, spans in covered[family_1].items() for lo, hi in spans]
+            columns = [(key, *cross_key_range(family_2, key, lo, hi, family_1))
+                       for key, spans in covered[family_2].items() for lo, hi in spans]
+            # diagonal lines only cross on points when their keys have the same parity, so sweep each parity apart
+            parities = (0, 1) if family_1 in 'da' and family_2 in 'da' else (None,)
+            for parity in parities:
+                if parity is not None:
+                    rows_of_parity = [row for row in rows if row[0] % 2 == parity]
+                    columns_of_parity = [column for column in columns if column[0] % 2 == parity]
+                else:
+                    rows_of_parity, columns_of_parity = rows, columns
+                for key_1, key_2 in sweep_crossings(rows_of_parity, columns_of_parity):
+                    crossings.add(line_intersection(family_1, key_1, family_2, key_2))
+
+    # points inside a collinear overlap, less those already counted as crossings
+    n_overlaps = len(crossings)
+    for family in LINE_FAMILIES:
+        for key, spans in overlapped[family].items():
+            n_overlaps += sum(hi - lo + 1 for lo, hi in spans)
+        for point in crossings:
+            key = key_on_line(family, *point)
+            if key in overlapped[family] and interval_containing(overlapped[family][key],
+                                                                 overlapped_starts[family][key],
+                                                                 param_on_line(family, *point)):
+                n_overlaps -= 1
+    return n_overlaps
+
+def parse_segments(lines) -> np.ndarray:
+    """ Parse every 'x1,y1 -> x2,y2' line at once into an (N, 4) int32 array of segment endpoints """
+    text = ' '.join(lines).replace(' -> ', ',').replace(',', ' ')
+    return np.array(text.split(), dtype=np.int32).reshape(-1, 4)
+
+
+def axis_aligned(segments: np.ndarray) -> np.ndarray:
+    """ Select the horizontal and vertical segments from an (N, 4) endpoint array """
+    return segments[(segments[:, 0] == segments[:, 2]) | (segments[:, 1] == segments[:, 3])]
+
+
+def segment_points(segments: np.ndarray) -> (np.ndarray, np.ndarray):
+    """
+    Expand every segment into the coordinates of the points it covers in a single vectorized pass, using np.repeat to
+    give each point its segment index and its step along the segment.
+
+    :arg segments: (N, 4) array of x1, y1, x2, y2 endpoints of horizontal, vertical or 45 degree segments
+    """
+    x1, y1, x2, y2 = segments.T.astype(np.int64)
+    step_x = np.sign(x2 - x1)
+    step_y = np.sign(y2 - y1)
+    lengths = np.maximum(np.abs(x2 - x1), np.abs(y2 - y1)) + 1
+    segment_index = np.repeat(np.arange(len(segments)), lengths)
+    steps = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    x_coords = x1[segment_index] + steps * step_x[segment_index]
+    y_coords = y1[segment_index] + steps * step_y[segment_index]
+    return x_coords, y_coords
+
+
+def field_bounds(segments: np.ndarray) -> ((int, int), (int, int)):
+    """ Return the origin and shape of the smallest field containing every segment """
+    xs = segments[:, [0, 2]]
+    ys = segments[:, [1, 3]]
+    origin = (int(xs.min()), int(ys.min())) if len(segments) else (0, 0)
+    shape = (int(xs.max()) - origin[0] + 1, int(ys.max()) - origin[1] + 1) if len(segments) else (0, 0)
+    return origin, shape
+
+
+def flat_point_keys(segments: np.ndarray, origin: (int, int), shape: (int, int)) -> np.ndarray:
+    """ Row-major index into a field of the given origin and shape of every point covered by the segments """
+    x_coords, y_coords = segment_points(segments)
+    return (x_coords - origin[0]) * shape[1] + (y_coords - origin[1])
+
+
+def sparse_coverage(segments: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Return the covered points in coordinate (COO) form as x, y and count arrays, using memory proportional to the
+    number of covered points rather than the area of the field.
+    """
+    origin, shape = field_bounds(segments)
+    keys, counts = np.unique(flat_point_keys(segments, origin, shape), return_counts=True)
+    x_coords = keys // max(shape[1], 1) + origin[0]
+    y_coords = keys % max(shape[1], 1) + origin[1]
+    return x_coords, y_coords, counts.astype(np.min_scalar_type(counts.max() if len(counts) else 0))
+
+
+def rasterize_segments(segments: np.ndarray, shape=None, origin=None) -> np.ndarray:
+    """
+    Count how many segments cover each point of the field.
+
+    The field is sized from the bounding box of the segments unless a shape is given. The points are accumulated
+    by their flat index with np.unique and scattered into a field allocated directly in the smallest unsigned integer
+    dtype that holds the highest count, so no wider temporary of the field's size is ever built.
+
+    :arg segments: (N, 4) array of x1, y1, x2, y2 endpoints of horizontal, vertical or 45 degree segments
+    :arg shape: shape of the field, indexed as field[x - origin[0], y - origin[1]]
+    :arg origin: coordinates of field[0, 0], defaults to the corner of the bounding box
+    """
+    bounds_origin, bounds_shape = field_bounds(segments)
+    origin = bounds_origin if origin is None else origin
+    shape = (bounds_origin[0] + bounds_shape[0] - origin[0], bounds_origin[1] + bounds_shape[1] - origin[1]) \
+        if shape is None else shape
+    if len(segments):
+        end = (bounds_origin[0] + bounds_shape[0], bounds_origin[1] + bounds_shape[1])
+        if bounds_origin[0] < origin[0] or bounds_origin[1] < origin[1] or \
+                end[0] > origin[0] + shape[0] or end[1] > origin[1] + shape[1]:
+            raise ValueError(f'segments span {bounds_origin} to {end}, outside of the field of shape {shape} '
+                             f'at origin {origin}')
+    keys, counts = np.unique(flat_point_keys(segments, origin, shape), return_counts=True)
+    field = np.zeros(shape, dtype=np.min_scalar_type(counts.max() if len(counts) else 0))
+    field.reshape(-1)[keys] = counts
+    return field
+
+
+def count_field_overlaps(segments: np.ndarray, max_dense_cells: int = MAX_DENSE_CELLS) -> int:
+    """
+    Count the points covered by at least two segments, falling back to the sparse representation when the bounding
+    box has more than max_dense_cells cells.
+    """
+    origin, shape = field_bounds(segments)
+    if shape[0] * shape[1] > max_dense_cells:
+        counts = sparse_coverage(segments)[2]
+        return int(np.sum(counts >= 2))
+    return int(np.sum(rasterize_segments(segments) >= 2))
+
+
+def grow_field(field: np.ndarray, origin: (int, int), batch_origin: (int, int), batch_shape: (int, int),
+               margin: int = 0) -> (np.ndarray, (int, int)):
+    """
+    Return a field that also covers the batch_shape box at batch_origin, copying the existing counts over. When the
+    field has to grow it is padded by margin cells on the sides it grows towards.
+    """
+    if field.size == 0:
+        return np.zeros(batch_shape, dtype=field.dtype), batch_origin
+    end = (origin[0] + field.shape[0], origin[1] + field.shape[1])
+    batch_end = (batch_origin[0] + batch_shape[0], batch_origin[1] + batch_shape[1])
+    new_origin = tuple(o if o <= b else b - margin for o, b in zip(origin, batch_origin))
+    new_end = tuple(e if e >= b else b + margin for e, b in zip(end, batch_end))
+    if new_origin == origin and new_end == end:
+        return field, origin
+    grown = np.zeros((new_end[0] - new_origin[0], new_end[1] - new_origin[1]), dtype=field.dtype)
+    offset = (origin[0] - new_origin[0], origin[1] - new_origin[1])
+    grown[offset[0]:offset[0] + field.shape[0], offset[1]:offset[1] + field.shape[1]] = field
+    return grown, new_origin
+
+
+def accumulate_segments(field: np.ndarray, origin: (int, int), segments: np.ndarray) -> (np.ndarray, (int, int)):
+    """
+    Add the coverage of a batch of segments to an existing field, growing the field when the batch reaches outside of
+    it and widening its dtype when a count no longer fits. Returns the (possibly new) field and its origin.
+    """
+    if len(segments) == 0:
+        return field, origin
+    field, origin = grow_field(field, origin, *field_bounds(segments))
+
+    keys, counts = np.unique(flat_point_keys(segments, origin, field.shape), return_counts=True)
+    totals = field.reshape(-1)[keys].astype(np.int64) + counts
+    if totals.max() > np.iinfo(field.dtype).max:
+        field = field.astype(np.min_scalar_type(totals.max()))
+    field.reshape(-1)[keys] = totals
+    return field, origin
+
+
+def stream_field(f, chunk_size: int = 100_000, include_diagonals: bool = True) -> (np.ndarray, (int, int)):
+    """
+    Build the field from an open segment file chunk_size lines at a time, so peak memory is bounded by the chunk and
+    the field rather than by the size of the file. Returns the field and its origin.
+    """
+    field, origin = np.zeros((0, 0), dtype=np.uint8), (0, 0)
+    while True:
+        lines = list(islice(f, chunk_size))
+        if not lines:
+            return field, origin
+        segments = parse_segments(lines)
+        if not include_diagonals:
+            segments = axis_aligned(segments)
+        field, origin = accumulate_segments(field, origin, segments)
+
+
+def tile_cut_steps(start: np.ndarray, end: np.ndarray, step: np.ndarray, tile_size: int) -> (np.ndarray, np.ndarray):
+    """
+    Steps along each segment at which one coordinate enters a new tile, computed from the endpoints alone. Returns the
+    segment index and the step of every cut.
+    """
+    first_tile, last_tile = start // tile_size, end // tile_size
+    n_cuts = np.abs(last_tile - first_tile)
+    segment_index = np.repeat(np.arange(len(start)), n_cuts)
+    k = np.arange(n_cuts.sum()) - np.repeat(np.cumsum(n_cuts) - n_cuts, n_cuts) + 1
+    forward = step[segment_index] > 0
+    # moving up the k-th new tile starts at its lowest coordinate, moving down at its highest
+    entered = np.where(forward, (first_tile[segment_index] + k) * tile_size,
+                       (first_tile[segment_index] - k + 1) * tile_size - 1)
+    return segment_index, np.abs(entered - start[segment_index])
+
+
+def segment_runs(segments: np.ndarray, tile_size: int) -> (np.ndarray, np.ndarray):
+    """
+    Clip every segment at the tile boundaries it crosses: a piece is a run of consecutive points of one segment that
+    fall in the same tile. The cuts are computed from the endpoints, so the work is proportional to the number of
+    pieces rather than the number of points. Returns the (M, 4) endpoints of the pieces and the (M, 2) tile index of
+    each.
+    """
+    x1, y1, x2, y2 = segments.reshape(-1, 4).T.astype(np.int64)
+    step_x, step_y = np.sign(x2 - x1), np.sign(y2 - y1)
+    lengths = np.maximum(np.abs(x2 - x1), np.abs(y2 - y1)) + 1
+    cuts_x = tile_cut_steps(x1, x2, step_x, tile_size)
+    cuts_y = tile_cut_steps(y1, y2, step_y, tile_size)
+    segment_index = np.concatenate([np.arange(len(lengths)), cuts_x[0], cuts_y[0]])
+    steps = np.concatenate([np.zeros(len(lengths), dtype=np.int64), cuts_x[1], cuts_y[1]])
+    # a diagonal segment crossing a tile corner is cut in x and in y at the same step
+    piece_keys = np.unique(segment_index * int(lengths.max(initial=1)) + steps)
+    segment_index, first = np.divmod(piece_keys, int(lengths.max(initial=1)))
+    last = lengths[segment_index] - 1
+    same_segment = segment_index[1:] == segment_index[:-1]
+    last[:-1][same_segment] = first[1:][same_segment] - 1
+    start_x, start_y = x1[segment_index], y1[segment_index]
+    pieces = np.stack([start_x + first * step_x[segment_index], start_y + first * step_y[segment_index],
+                       start_x + last * step_x[segment_index], start_y + last * step_y[segment_index]], axis=1)
+    return pieces, pieces[:, :2] // tile_size
+
+
+def route_to_tiles(segments: np.ndarray, tile_size: int) -> dict[(int, int), np.ndarray]:
+    """ Group the clipped pieces of every segment by the tile that contains them """
+    pieces, tiles = segment_runs(segments, tile_size)
+    order = np.lexsort((tiles[:, 1], tiles[:, 0]))
+    pieces, tiles = pieces[order], tiles[order]
+    boundaries = np.flatnonzero(np.any(tiles[1:] != tiles[:-1], axis=1)) + 1
+    return {(int(group_tiles[0, 0]), int(group_tiles[0, 1])): group_pieces
+            for group_pieces, group_tiles in zip(np.split(pieces, boundaries), np.split(tiles, boundaries))
+            if len(group_pieces)}
+
+
+def tiled_overlaps(segments: np.ndarray, tile_size: int = 1024, max_workers=None) -> int:
+    """
+    Count the points covered by at least two segments by splitting the plane into tile_size x tile_size tiles and
+    counting each tile in its own process. Only the tiles that segments cross are ever allocated.
+    """
+    tiles = route_to_tiles(segments, tile_size)
+    if not tiles:
+        return 0
+    max_workers = max_workers or os.cpu_count()
+    chunksize = max(1, len(tiles) // (4 * max_workers))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return sum(executor.map(count_field_overlaps, tiles.values(), chunksize=chunksize))
+
+
+class VentField:
+    """
+    Coverage counts that are kept up to date as segments are added and removed.
+
+    Each update only touches the points of the segment, and the number of points covered by at least two segments is
+    maintained alongside the counts, so it never needs to be recomputed from scratch. The field grows (with slack) as
+    segments arrive outside of it. The segments currently in the field are counted, so only those can be removed.
+    """
+    def __init__(self, segments=None):
+        self.field = np.zeros((0, 0), dtype=np.uint8)
+        self.origin = (0, 0)
+        self.n_overlaps = 0
+        self.segments = Counter()
+        if segments is not None and len(segments):
+            self.field, self.origin = accumulate_segments(self.field, self.origin, np.asarray(segments))
+            self.n_overlaps = int(np.count_nonzero(self.field >= 2))
+            self.segments.update(self.segment_key(segment) for segment in segments)
+
+    @staticmethod
+    def segment_key(segment) -> (int, int, int, int):
+        """ The same segment whichever end it is given from """
+        x1, y1, x2, y2 = (int(c) for c in np.asarray(segment).ravel())
+        return min((x1, y1, x2, y2), (x2, y2, x1, y1))
+
+    def _field_points(self, segment) -> (np.ndarray, np.ndarray):
+        segment = np.asarray(segment, dtype=np.int64).reshape(1, 4)
+        x_coords, y_coords = segment_points(segment)
+        return x_coords - self.origin[0], y_coords - self.origin[1]
+
+    def add(self, segment):
+        segment = np.asarray(segment, dtype=np.int64).reshape(1, 4)
+        self.field, self.origin = grow_field(self.field, self.origin, *field_bounds(segment),
+                                             margin=max(self.field.shape, default=0))
+        x_coords, y_coords = self._field_points(segment)
+        before = self.field[x_coords, y_coords]
+        if before.max() == np.iinfo(self.field.dtype).max:
+            self.field = self.field.astype(np.min_scalar_type(int(before.max()) + 1))
+        self.field[x_coords, y_coords] = before.astype(self.field.dtype) + 1
+        self.n_overlaps += int(np.count_nonzero(before == 1))
+        self.segments[self.segment_key(segment)] += 1
+
+    def remove(self, segment):
+        key = self.segment_key(segment)
+        if not self.segments[key]:
+            raise ValueError(f'segment {key} was never added to the field')
+        self.segments[key] -= 1
+        if not self.segments[key]:
+            del self.segments[key]
+        x_coords, y_coords = self._field_points(segment)
+        before = self.field[x_coords, y_coords]
+        self.field[x_coords, y_coords] = before - 1
+        self.n_overlaps -= int(np.count_nonzero(before == 2))
+
+    def coverage(self, x: int, y: int) -> int:
+        """ Number of segments covering the point (x, y) """
+        i, j = x - self.origin[0], y - self.origin[1]
+        if 0 <= i < self.field.shape[0] and 0 <= j < self.field.shape[1]:
+            return int(self.field[i, j])
+        return 0
+
+    def overlaps_in(self, x_min: int, y_min: int, x_max: int, y_max: int) -> int:
+        """ Number of points covered by at least two segments in the inclusive window [x_min, x_max] x [y_min, y_max] """
+        i_min, j_min = max(x_min - self.origin[0], 0), max(y_min - self.origin[1], 0)
+        i_max, j_max = x_max - self.origin[0] + 1, y_max - self.origin[1] + 1
+        if i_max <= i_min or j_max <= j_min:
+            return 0
+        return int(np.count_nonzero(self.field[i_min:i_max, j_min:j_max] >= 2))
+
+
+def show_field(field, title='', renderer=None):
+    render([(title, field)], renderer)
+
+def show_segments(segments, title='', renderer=None, max_dense_cells: int = MAX_DENSE_CELLS):
+    """ Render the field of the segments, unless nothing is rendered or the field would be too large to allocate """
+    origin, shape = field_bounds(segments)
+    if renderer not in (None, 'none') and shape[0] * shape[1] <= max_dense_cells:
+        show_field(rasterize_segments(segments), title, renderer)
+
+def part_1(lines, renderer=None):
+    segments = axis_aligned(parse_segments(lines))
+    show_segments(segments, 'part1', renderer)
+    print(count_field_overlaps(segments))
 
     # line_segments = [parse_line(line) for line in lines]
     # field = np.zeros((10, 10))
@@ -131,17 +621,26 @@ def part_1(lines):
     # print(field)
     # print(np.sum(field>=2))
 
-def part_2(lines):
-    line_segments = [LineSegment(line) for line in lines]
-    field = np.zeros((1000, 1000))
-    for ls in line_segments:
-        field[ls.x_coords, ls.y_coords] += 1
-    show_field(field, 'part2')
-    print(np.sum(field >= 2))
+def part_2(lines, renderer=None):
+    segments = parse_segments(lines)
+    show_segments(segments, 'part2', renderer)
+    print(count_field_overlaps(segments))
 
 if __name__ == '__main__':
     with open('day5_input.txt') as f:
     # with open('day5_testinput.txt') as f:
         lines = f.readlines()
-    part_1(lines)
-    part_2(lines)
\ No newline at end of file
+    renderer = os.environ.get('AOC_RENDERER', 'matplotlib')
+    part_1(lines, renderer)
+    part_2(lines, renderer)
+    line_segments = [parse_line(line) for line in lines]
+    print(f'part 1 without a field: {count_overlaps(line_segments, include_diagonals=False)}')
+    print(f'part 2 without a field: {count_overlaps(line_segments)}')
+    with open('day5_input.txt') as f:
+        field, origin = stream_field(f, chunk_size=128)
+    print(f'part 2 streamed: {np.sum(field >= 2)}')
+    vent_field = VentField()
+    for segment in parse_segments(lines):
+        vent_field.add(segment)
+    print(f'part 2 incremental: {vent_field.n_overlaps}')
+    print(f'part 2 tiled: {tiled_overlaps(parse_segments(lines), tile_size=256)}')
\ No newline at end of file
@@ -50,27 +50,238 @@ In this example, after 18 days, there are a total of 26 fish. After 80 days, the
 Find a way to simulate lanternfish. How many lanternfish would there be after 80 days?
 """
 import numpy as np
-from collections import Counter
-
-def fishy_simulator(line, n_days_to_simulate):
-    fishies = np.fromstring(line, sep=',')
-    fish_census = Counter(fishies)
-    for i in range(0, 9):
-        if i not in fish_census.keys():
-            fish_census[i] = 0
-    print(f' Inital state: {fish_census}')
+from collections import namedtuple
+from functools import lru_cache
+
+N_TIMER_STATES = 9
+
+# spawn_interval: days between litters, newborn_delay: extra days before a newborn's first cycle,
+# litter_size: babies per litter, mortality: fraction of fish dying each day
+PopulationModel = namedtuple('PopulationModel', ['spawn_interval', 'newborn_delay', 'litter_size', 'mortality'],
+                             defaults=(7, 2, 1, 0))
+LANTERNFISH = PopulationModel()
+
+def print_census(day: int, census: list[int]):
+    """ Trace callback reproducing the old verbose per-day output """
+    print(f'After day {day}: {census[8]} new fish born. Total pop is {sum(census)} Current census: \n {dict(enumerate(census))}')
+
+
+class CensusTrace:
+    """
+    Trace callback keeping the last `capacity` census snapshots in a ring buffer of shape (capacity, 9).
+    """
+    def __init__(self, capacity: int = 1024, dtype=np.int64):
+        self.days = np.zeros(capacity, dtype=np.int64)
+        self.censuses = np.zeros((capacity, N_TIMER_STATES), dtype=dtype)
+        self.n_recorded = 0
+
+    def __call__(self, day: int, census: list[int]):
+        slot = self.n_recorded % len(self.days)
+        self.days[slot] = day
+        self.censuses[slot] = census
+        self.n_recorded += 1
+
+    def snapshots(self) -> (np.ndarray, np.ndarray):
+        """ Return the recorded days and censuses, oldest first """
+        n_kept = min(self.n_recorded, len(self.days))
+        order = (np.arange(n_kept) + self.n_recorded - n_kept) % len(self.days)
+        return self.days[order], self.censuses[order]
+
+
+def fishy_simulator(line, n_days_to_simulate, trace=None, trace_every=1):
+    """
+    Simulate the fish day by day and return the total population.
+
+    :arg trace: optional callback called as trace(day, census) on day 0 and every trace_every days after, e.g.
+                print_census or a CensusTrace
+    """
+    fish_census = initial_census(line)
+    if trace is not None:
+        trace(0, fish_census)
     for i in range(1, n_days_to_simulate+1):
-        new_census = {key-1: value for (key, value) in fish_census.items()}
-        new_fishies = new_census.pop(-1) if -1 in new_census.keys() else 0
-        new_census[6] = new_census[6] + new_fishies # return the parents to state 6
-        new_census[8] = new_fishies # add the babies to state 8
-        fish_census = new_census
-        print(f'After day {i}: {new_fishies} new fish born. Total pop is {sum(fish_census.values())} Current census: \n {fish_census}')
-    return sum(fish_census.values())
+        new_fishies = fish_census[0]
+        fish_census = fish_census[1:] + [new_fishies]  # add the babies to state 8
+        fish_census[6] += new_fishies  # return the parents to state 6
+        if trace is not None and i % trace_every == 0:
+            trace(i, fish_census)
+    return sum(fish_census)
+
+
+
+def initial_census(line: str, n_states: int = N_TIMER_STATES) -> list[int]:
+    """ Count the fish with each timer value 0 to n_states-1 """
+    census = [0] * n_states
+    for timer in line.strip().split(','):
+        if not 0 <= int(timer) < n_states:
+            raise ValueError(f'timer {timer} is outside of the {n_states} timer states')
+        census[int(timer)] += 1
+    return census
+
+
+@lru_cache(maxsize=None)
+def compile_model(model: PopulationModel) -> tuple[tuple]:
+    """
+    Build the (read-only, cached) transition matrix of a population model: entry [i][j] is the expected number of
+    fish with timer i tomorrow for each fish with timer j today.
+    """
+    n_states = model.spawn_interval + model.newborn_delay
+    survival = 1 - model.mortality if model.mortality else 1
+    matrix = [[0] * n_states for _ in range(n_states)]
+    for timer in range(1, n_states):
+        matrix[timer - 1][timer] = survival  # every timer counts down
+    matrix[model.spawn_interval - 1][0] += survival  # parents reset
+    matrix[n_states - 1][0] += model.litter_size * survival  # babies start with the newborn delay on top
+    return tuple(tuple(row) for row in matrix)
+
+
+def transition_matrix(model: PopulationModel = LANTERNFISH) -> list[list[int]]:
+    """ matrix[i][j] is the number of fish with timer i tomorrow for each fish with timer j today """
+    return [list(row) for row in compile_model(model)]
+
+
+def matrix_multiply(a: list[list[int]], b: list[list[int]], modulus: int = None) -> list[list[int]]:
+    product = [[sum(a_ik * b_kj for a_ik, b_kj in zip(row, column)) for column in zip(*b)] for row in a]
+    if modulus is not None:
+        product = [[value % modulus for value in row] for row in product]
+    return product
+
+
+def matrix_power(matrix: list[list[int]], n: int, modulus: int = None) -> list[list[int]]:
+    """ Raise a square matrix to the n-th power by repeated squaring """
+    result = [[int(i == j) for j in range(len(matrix))] for i in range(len(matrix))]
+    while n > 0:
+        if n & 1:
+            result = matrix_multiply(result, matrix, modulus)
+        matrix = matrix_multiply(matrix, matrix, modulus)
+        n >>= 1
+    return result
+
+
+def population_after(line: str, n_days: int, modulus: int = None) -> int:
+    """
+    Total population after n_days, computed with O(log n_days) 9x9 matrix products in exact integer arithmetic.
+    The population grows exponentially, so pass a modulus for very long horizons to keep the numbers small.
+    """
+    census = initial_census(line)
+    days = matrix_power(transition_matrix(), n_days, modulus)
+    population = sum(sum(row[j] * census[j] for j in range(N_TIMER_STATES)) for row in days)
+    return population % modulus if modulus is not None else population
+
+
+@lru_cache(maxsize=4096)
+def descendant_weights(model: PopulationModel, n_days: int) -> tuple:
+    """
+    Population after n_days descending from a single fish with each timer value (column sums of T^n_days).
+
+    Each column of T has at most three non-zero entries, so stepping the weights one day costs O(states) and beats
+    the O(states^3 log n_days) matrix power unless the horizon is very long.
+    """
+    matrix = compile_model(model)
+    n_states = len(matrix)
+    if n_days > n_states ** 2 * max(n_days.bit_length(), 1):
+        days = matrix_power(transition_matrix(model), n_days)
+        return tuple(sum(column) for column in zip(*days))
+    sources = [[(i, matrix[i][j]) for i in range(n_states) if matrix[i][j]] for j in range(n_states)]
+    weights = [1] * n_states
+    for _ in range(n_days):
+        weights = [sum(weights[i] * rate for i, rate in column) for column in sources]
+    return tuple(weights)
+
+
+def simulate_population(line: str, n_days: int, model: PopulationModel = LANTERNFISH):
+    """
+    Expected population after n_days under a general population model. The model's transition matrix and its powers
+    are cached, so repeated evaluations of the same model and horizon cost a single dot product.
+    """
+    weights = descendant_weights(model, n_days)
+    census = initial_census(line, n_states=len(weights))
+    return sum(w * c for w, c in zip(weights, census))
+
+
+def census_matrix(lines: list[str]) -> np.ndarray:
+    """ Stack the timer census of one school per line into an (M, 9) int64 array """
+    return np.array([initial_census(line) for line in lines], dtype=np.int64).reshape(-1, N_TIMER_STATES)
+
+
+def descendants_per_timer(horizons) -> list[list[int]]:
+    """
+    For every horizon h, the number of fish after h days descending from a single fish with each timer value 0-8
+    (the column sums of T^h). Horizons are visited in sorted order, stepping short gaps one day at a time and jumping
+    long gaps with a matrix power.
+    """
+    descendants = {}
+    current, current_day = [1] * N_TIMER_STATES, 0
+    for horizon in sorted(set(int(h) for h in horizons)):
+        gap = horizon - current_day
+        if gap < 256:
+            for _ in range(gap):
+                current = [current[6] + current[8]] + current[:-1]
+        else:
+            jump = matrix_power(transition_matrix(), gap)
+            current = [sum(current[i] * jump[i][j] for i in range(N_TIMER_STATES)) for j in range(N_TIMER_STATES)]
+        descendants[horizon], current_day = current, horizon
+    return [descendants[int(h)] for h in horizons]
+
+
+def fits_int64(censuses: np.ndarray, descendants: list[list[int]]) -> bool:
+    """ Whether every population grown from the censuses with these descendant counts stays within int64 """
+    largest_school = int(censuses.sum(axis=1).max()) if censuses.size else 0
+    largest_descendants = max((max(row) for row in descendants), default=0)
+    int64_max = np.iinfo(np.int64).max
+    return largest_school <= int64_max and largest_descendants <= int64_max and \
+        largest_school * largest_descendants <= int64_max
+
+
+def exact_censuses(censuses: np.ndarray) -> np.ndarray:
+    # np.frompyfunc(int) so float censuses become Python ints rather than floats that overflow
+    return np.frompyfunc(int, 1, 1)(censuses).astype(object)
+
+
+def forecast_populations(censuses: np.ndarray, horizons) -> np.ndarray:
+    """
+    Population of every school at every horizon as an (M, H) array.
+
+    Summing T^h over its rows gives the descendants after h days of one fish with each timer value, so all schools
+    are forecast at once with a single (M, 9) x (9, H) product. The result is int64 when it is guaranteed to fit and
+    an exact object (Python int) array otherwise.
+    """
+    censuses = np.asarray(censuses).reshape(-1, N_TIMER_STATES)
+    descendants = descendants_per_timer(horizons)
+    if fits_int64(censuses, descendants):
+        return censuses.astype(np.int64) @ np.array(descendants, dtype=np.int64).reshape(-1, N_TIMER_STATES).T
+    return exact_censuses(censuses) @ np.array(descendants, dtype=object).reshape(-1, N_TIMER_STATES).T
+
+
+def forecast_trajectories(censuses: np.ndarray, n_days: int, out: np.ndarray = None) -> np.ndarray:
+    """
+    Census of every school on every day as an (M, n_days + 1, 9) array, stepping all schools at once.
+
+    Populations never shrink, so the default array is int64 when the populations on the last day fit and an exact
+    object (Python int) array otherwise.
+
+    :arg out: preallocated (M, n_days + 1, 9) array to fill
+    """
+    censuses = np.asarray(censuses).reshape(-1, N_TIMER_STATES)
+    if out is None:
+        if fits_int64(censuses, descendants_per_timer([n_days])):
+            out = np.empty((len(censuses), n_days + 1, N_TIMER_STATES), dtype=np.int64)
+        else:
+            out = np.empty((len(censuses), n_days + 1, N_TIMER_STATES), dtype=object)
+            censuses = exact_censuses(censuses)
+    out[:, 0] = censuses
+    for day in range(n_days):
+        today, tomorrow = out[:, day], out[:, day + 1]
+        tomorrow[:, :-1] = today[:, 1:]
+        tomorrow[:, 6] += today[:, 0]
+        tomorrow[:, 8] = today[:, 0]
+    return out
 
 
 if __name__ == '__main__':
     with open('day6_input.txt') as f:
         line = f.readline()
-    # fishy_simulator(line, n_days_to_simulate=80) # part 1
-    fishy_simulator(line, n_days_to_simulate=256) # part 2
\ No newline at end of file
+    # fishy_simulator(line, n_days_to_simulate=80, trace=print_census) # part 1
+    print(f'simulated part 2: {fishy_simulator(line, n_days_to_simulate=256)}') # part 2
+    print(f'part 1: {population_after(line, n_days=80)}')
+    print(f'part 2: {population_after(line, n_days=256)}')
+    print(f'part 2 with twins: {simulate_population(line, n_days=256, model=PopulationModel(litter_size=2))}')
\ No newline at end of file
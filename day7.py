@@ -31,24 +31,61 @@ This costs a total of 37 fuel. This is the cheapest possible outcome; more expen
 
 Determine the horizontal position that the crabs can align to using the least fuel possible. How much fuel must they spend to align to that position?
 """
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
-from typing import Callable
+from typing import Callable, Union
+
+# fuel cost of moving a distance d, written to work on whole arrays of distances at once
+COST_KERNELS = {'linear': lambda d: d,
+                'triangular': lambda d: d * (d + 1) // 2,
+                'quadratic': lambda d: d * d,
+                }
+
+
+def polynomial_cost(coefficients) -> Callable[[np.ndarray], np.ndarray]:
+    """ Vectorized kernel for the cost c0 + c1*d + c2*d^2 + ... """
+    return lambda d: np.polynomial.polynomial.polyval(d, coefficients)
+
+
+def cost_kernel(cost_function: Union[str, Callable[[int], int]]) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Turn a cost function into one that operates on whole arrays of distances.
+
+    Names are looked up in COST_KERNELS and ufuncs are used as is. Other callables are probed with a small array: if
+    they return matching elementwise results they are used directly, otherwise they are wrapped in np.vectorize.
+    """
+    if isinstance(cost_function, str):
+        return COST_KERNELS[cost_function]
+    if isinstance(cost_function, np.ufunc):
+        return cost_function
+    probe = np.arange(4)
+    try:
+        vectorized = np.asarray(cost_function(probe))
+        expected = np.array([cost_function(int(d)) for d in probe])
+        if vectorized.shape == probe.shape and np.array_equal(vectorized, expected):
+            return cost_function
+    except Exception:
+        pass
+    return np.vectorize(cost_function)
 
 
 def solve_problem(positions: np.ndarray, cost_function: Callable[[int], int]):
     target_position = np.median(positions)
     distance_to_target = np.abs(positions - target_position)
-    cost = np.vectorize(cost_function)(distance_to_target).sum()
+    cost = cost_kernel(cost_function)(distance_to_target).sum()
     print(f'target location: {target_position}')
     print(f'total cost: {cost}')
     return cost
 
 
 def for_loop_method(positions, cost_function):
+    kernel = cost_kernel(cost_function)
     costs = []
     for target in range(0, int(positions.max())):
         distance = np.abs(positions - target)
-        cost = np.vectorize(cost_function)(distance).sum()
+        cost = kernel(distance).sum()
         costs.append(cost)
     costs = np.array(costs)
     answer = costs.min()
@@ -57,6 +94,159 @@ def for_loop_method(positions, cost_function):
     return answer
 
 
+class CrabFleet:
+    """
+    Crab positions sorted once, with prefix sums that give the total linear, triangular or quadratic fuel cost of
+    aligning on any target in O(log n).
+    """
+    def __init__(self, positions: np.ndarray):
+        self.positions = np.sort(np.asarray(positions, dtype=np.int64))
+        self.n_crabs = len(self.positions)
+        self.prefix_sums = np.concatenate([[0], np.cumsum(self.positions)])
+        self.total = int(self.prefix_sums[-1])
+        self.total_of_squares = int(np.sum(self.positions.astype(object) ** 2)) if self.n_crabs else 0
+
+    def linear_cost(self, target: int) -> int:
+        """ sum of |position - target| """
+        n_left = int(np.searchsorted(self.positions, target, side='right'))
+        left_sum = int(self.prefix_sums[n_left])
+        return target * n_left - left_sum + (self.total - left_sum) - target * (self.n_crabs - n_left)
+
+    def quadratic_cost(self, target: int) -> int:
+        """ sum of d * d with d = |position - target| """
+        return self.total_of_squares - 2 * target * self.total + self.n_crabs * target * target
+
+    def triangular_cost(self, target: int) -> int:
+        """ sum of d * (d + 1) / 2 with d = |position - target| """
+        return (self.quadratic_cost(target) + self.linear_cost(target)) // 2
+
+    def general_cost(self, target: int, kernel: Callable[[np.ndarray], np.ndarray]):
+        """
+        sum of kernel(d) with d = |position - target|
+
+        The kernel is first evaluated in float to estimate the size of the total; when that could overflow int64 the
+        exact total is taken over Python ints instead. Like the other costs, the total is a Python int (or float).
+        """
+        distance = np.abs(self.positions - target)
+        estimate = np.abs(kernel(distance.astype(np.float64))).sum()
+        if estimate < 2 ** 62:
+            total = kernel(distance).sum()
+            return total.item() if isinstance(total, np.generic) else total
+        return kernel(distance.astype(object)).sum()
+
+
+def ternary_search(cost: Callable[[int], int], lo: int, hi: int) -> (int, int):
+    """ Find the integer in [lo, hi] minimizing a convex cost, returning (target, cost) """
+    while hi - lo > 2:
+        third = (hi - lo) // 3
+        left, right = lo + third, hi - third
+        left_cost, right_cost = cost(left), cost(right)
+        if left_cost < right_cost:
+            hi = right - 1
+        elif left_cost > right_cost:
+            lo = left + 1
+        else:
+            lo, hi = left, right
+    return min(((target, cost(target)) for target in range(lo, hi + 1)), key=lambda candidate: candidate[1])
+
+
+def optimize_alignment(positions: np.ndarray, cost='linear') -> (int, int):
+    """
+    Find the cheapest alignment target and its total cost.
+
+    The linear cost is minimized at the median, the quadratic cost at the mean and the triangular cost within half a
+    position of the mean, so those only evaluate a couple of candidates. Any other convex cost_function (distance -> fuel) is ternary searched over
+    the range of positions using its vectorized kernel.
+
+    :arg cost: 'linear', 'triangular', another name from COST_KERNELS or a convex Callable[[int], int]
+    """
+    fleet = CrabFleet(positions)
+    if cost == 'linear':
+        target = int(fleet.positions[(fleet.n_crabs - 1) // 2])
+        return target, fleet.linear_cost(target)
+    if cost == 'triangular':
+        mean = fleet.total // fleet.n_crabs
+        return min(((target, fleet.triangular_cost(target)) for target in (mean - 1, mean, mean + 1, mean + 2)),
+                   key=lambda candidate: candidate[1])
+    if cost == 'quadratic':
+        mean = fleet.total // fleet.n_crabs
+        return min(((target, fleet.quadratic_cost(target)) for target in (mean, mean + 1)),
+                   key=lambda candidate: candidate[1])
+    kernel = cost_kernel(cost)
+    return ternary_search(lambda target: fleet.general_cost(target, kernel),
+                          int(fleet.positions[0]), int(fleet.positions[-1]))
+
+
+def histogram_costs(positions: np.ndarray, cost='linear') -> (np.ndarray, np.ndarray):
+    """
+    Total cost of aligning on every target between the lowest and highest position.
+
+    The positions are collapsed into a bincount histogram, so the work is O(range) for linear and triangular costs
+    (cumulative sums over the histogram) and O(range^2) for other kernels (convolution of the histogram with the
+    kernel), independent of the number of crabs.
+
+    :arg cost: 'linear', 'triangular', another name from COST_KERNELS or a Callable[[int], int]
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    offset = int(positions.min())
+    counts = np.bincount(positions - offset)
+    targets = np.arange(len(counts), dtype=np.int64)
+    if cost in ('linear', 'triangular'):
+        n_crabs = int(counts.sum())
+        weighted = counts * targets
+        n_at_or_left = np.cumsum(counts)
+        sum_at_or_left = np.cumsum(weighted)
+        total = int(sum_at_or_left[-1])
+        costs = targets * n_at_or_left - sum_at_or_left + (total - sum_at_or_left) - targets * (n_crabs - n_at_or_left)
+        if cost == 'triangular':
+            sum_of_squares = int(np.sum(weighted * targets)) - 2 * targets * total + n_crabs * targets * targets
+            costs = (sum_of_squares + costs) // 2
+    else:
+        kernel = cost_kernel(cost)(np.abs(np.arange(-len(counts) + 1, len(counts))))
+        costs = np.convolve(counts, kernel, mode='valid')
+    return targets + offset, costs
+
+
+def histogram_alignment(positions: np.ndarray, cost='linear') -> (int, int):
+    """ Cheapest alignment target and its total cost, from histogram_costs """
+    targets, costs = histogram_costs(positions, cost)
+    best = int(np.argmin(costs))
+    return int(targets[best]), costs[best].item()
+
+
+def align_fleet(positions: np.ndarray, cost='linear') -> (int, int):
+    """
+    Align one fleet with the fastest applicable strategy: the histogram solver when the range of positions is small
+    compared to the work of the sorted/ternary solver, optimize_alignment otherwise.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    position_range = int(positions.max() - positions.min()) + 1
+    if cost in ('linear', 'triangular'):
+        use_histogram = position_range <= len(positions)
+    else:
+        use_histogram = position_range ** 2 <= len(positions) * position_range.bit_length()
+    return histogram_alignment(positions, cost) if use_histogram else optimize_alignment(positions, cost)
+
+
+def read_fleets(path: str) -> list[np.ndarray]:
+    """ Read a file with the comma separated positions of one fleet per line """
+    with open(path) as f:
+        return [np.array(line.split(','), dtype=np.int64) for line in f if line.strip()]
+
+
+def align_fleets(fleets: list[np.ndarray], cost='linear', max_workers=None, chunksize=None) -> list[(int, int)]:
+    """
+    Align many fleets across a process pool, returning (target, cost) per fleet in order. Fleets are handed to the
+    workers in chunks to keep the per-fleet scheduling overhead low.
+
+    :arg cost: as for optimize_alignment; a callable must be picklable (a module level function, not a lambda)
+    """
+    max_workers = max_workers or os.cpu_count()
+    chunksize = chunksize or max(1, len(fleets) // (4 * max_workers))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(partial(align_fleet, cost=cost), fleets, chunksize=chunksize))
+
+
 if __name__ == '__main__':
     with open('day7_input.txt') as f:
         line = f.readline()
@@ -68,4 +258,9 @@ if __name__ == '__main__':
     print(f'answer to part 1: {answer1}')
     answer2 = for_loop_method(positions, lambda x: x*(x+1)/2)
     print(f'answer to part 2: {answer2}')
+    print(f'optimized part 1 (target, cost): {optimize_alignment(positions, "linear")}')
+    print(f'optimized part 2 (target, cost): {optimize_alignment(positions, "triangular")}')
+    print(f'histogram part 2 (target, cost): {histogram_alignment(positions.astype(int), "triangular")}')
+    fleets = read_fleets('day7_input.txt')
+    print(f'batched part 1: {align_fleets(fleets, "linear")}, batched part 2: {align_fleets(fleets, "triangular")}')
 
@@ -71,7 +71,12 @@ In the output values, how many times do digits 1, 4, 7, or 8 appear?
 For each entry, determine all of the wire/segment connections and decode the four-digit output values.
 What do you get if you add up all of the output values?
 """
-from collections import Counter
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import mmap
+import os
+import numpy as np
 from typing import Dict
 
 EncoderType = dict[str, int]
@@ -110,11 +115,17 @@ def create_decoder(encoder: EncoderType) -> DecoderType:
     return {encode_digit_output(value, encoder): key for key, value in SEGMENTS_IN_DIGITS.items()}
 
 
-def determine_digits_in_line(scrambled_signal_patterns: str, scrambled_digit_outputs: list[str], decoder: DecoderType) -> list[int]:
+def determine_digits_in_line(scrambled_signal_patterns: str, scrambled_digit_outputs: list[str], decoder: DecoderType = None) -> list[int]:
     """
     Determine the unscrambled values of the 4 output values based on the scrambled signal patterns and scrambled digit
-    output codes
+    output codes.
+
+    With the standard decoder (the default) the resolved wiring is looked up in the resolve_wiring cache, so entries
+    sharing the same scrambled wiring skip the encoder construction.
     """
+    if decoder is None or decoder == STANDARD_DECODER:
+        wiring = resolve_wiring(canonical_patterns(scrambled_signal_patterns))
+        return [wiring[pattern_mask(output)] for output in scrambled_digit_outputs]
     encoder = create_encoder(scrambled_signal_patterns.replace(' ', ''))
     encoded_digit_outputs = [encode_digit_output(x, encoder) for x in scrambled_digit_outputs]
     decoded_digit_outputs = [decoder[encoded_digit] for encoded_digit in encoded_digit_outputs]
@@ -162,6 +173,294 @@ SEGMENTS_IN_DIGITS = {0: 'abcefg',
                       9: 'abcdfg'
                       }
 
+SEGMENT_BITS = {letter: 1 << i for i, letter in enumerate('abcdefg')}
+
+
+def pattern_mask(pattern: str) -> int:
+    """ Encode a pattern as a 7-bit mask with bit i set when segment 'abcdefg'[i] is on """
+    mask = 0
+    for letter in pattern:
+        mask |= SEGMENT_BITS[letter]
+    return mask
+
+
+def wire_frequencies(masks: list[int]) -> list[int]:
+    """ Number of the 10 signal patterns each of the 7 wires appears in """
+    return [sum((mask >> wire) & 1 for mask in masks) for wire in range(7)]
+
+
+def create_signature_table() -> list[int]:
+    """
+    Lookup table from a digit's signature (the sum of the wire frequencies of its segments) to the digit. The wire
+    frequencies do not depend on the scrambling, and the ten signatures of the standard digits are all different.
+    """
+    frequencies = wire_frequencies([pattern_mask(pattern) for pattern in SEGMENTS_IN_DIGITS.values()])
+    table = [-1] * (sum(frequencies) + 1)
+    for digit, pattern in SEGMENTS_IN_DIGITS.items():
+        table[sum(frequencies[wire] for wire in range(7) if pattern_mask(pattern) >> wire & 1)] = digit
+    return table
+
+
+SIGNATURE_TABLE = create_signature_table()
+STANDARD_DECODER = create_decoder(create_encoder(' '.join(SEGMENTS_IN_DIGITS.values())))
+DECODER_CACHE_SIZE = 4096
+LETTER_BITS = np.zeros(256, dtype=np.uint8)
+LETTER_BITS[[ord(letter) for letter in SEGMENT_BITS]] = list(SEGMENT_BITS.values())
+POPCOUNT = np.array([bin(mask).count('1') for mask in range(128)], dtype=np.uint8)
+
+
+def canonical_patterns(scrambled_signal_patterns: str) -> tuple[int]:
+    """ The ten signal patterns as sorted bitmasks, identical for every entry with the same wiring """
+    return tuple(sorted(pattern_mask(pattern) for pattern in scrambled_signal_patterns.split()))
+
+
+def mask_letters(mask: int) -> str:
+    return ''.join(letter for letter, bit in SEGMENT_BITS.items() if mask & bit)
+
+
+@lru_cache(maxsize=DECODER_CACHE_SIZE)
+def resolve_wiring(patterns: tuple[int]) -> dict[int, int]:
+    """
+    Map the bitmask of each of the ten scrambled patterns to its digit. Bounded LRU cache, see decoder_cache_info()
+    for the hit and miss counts.
+    """
+    signal_patterns = [mask_letters(mask) for mask in patterns]
+    encoder = create_encoder(''.join(signal_patterns))
+    return {mask: STANDARD_DECODER[encode_digit_output(pattern, encoder)] for mask, pattern in zip(patterns, signal_patterns)}
+
+
+def decoder_cache_info():
+    """ Hits, misses and size of the resolve_wiring cache """
+    return resolve_wiring.cache_info()
+
+
+def decode_line(scrambled_signal_patterns: str, scrambled_digit_outputs: list[str]) -> list[int]:
+    """
+    Decode the output digits of one entry with integer lookups: count how often each of the 7 wires appears in the
+    signal patterns once, then index SIGNATURE_TABLE with each output's summed wire frequencies.
+    """
+    frequency = {letter: scrambled_signal_patterns.count(letter) for letter in SEGMENT_BITS}
+    return [SIGNATURE_TABLE[sum(map(frequency.__getitem__, output))] for output in scrambled_digit_outputs]
+
+
+def parse_bitmasks(text) -> np.ndarray:
+    """
+    Parse a whole file of entries in one pass into an (N, 14) uint8 array of segment bitmasks: the 10 signal patterns
+    followed by the 4 digit outputs of each entry.
+
+    :arg text: str, bytes or any buffer of ascii bytes (e.g. a slice of a memory map)
+    """
+    data = np.frombuffer(text.encode('ascii') if isinstance(text, str) else text, dtype=np.uint8)
+    is_letter = LETTER_BITS[data] != 0
+    word_starts = np.flatnonzero(is_letter & ~np.concatenate([[False], is_letter[:-1]]))
+    # separators map to 0, so OR-ing from one word start to the next only picks up that word's letters
+    masks = np.bitwise_or.reduceat(LETTER_BITS[data], word_starts) if word_starts.size else word_starts.astype(np.uint8)
+    return masks.reshape(-1, 14)
+
+
+def decode_bitmasks(masks: np.ndarray) -> np.ndarray:
+    """
+    Decode the 4 output digits of every entry of an (N, 14) bitmask array with array operations. The signature of an
+    output (the sum of its wires' frequencies) equals the number of segments it shares with each signal pattern,
+    summed over the 10 patterns, so it is computed with a popcount table.
+    """
+    shared = masks[:, :10, np.newaxis] & masks[:, np.newaxis, 10:]
+    signatures = POPCOUNT[shared].sum(axis=1, dtype=np.intp)
+    return np.array(SIGNATURE_TABLE, dtype=np.int8)[signatures]
+
+
+def answers_from_digits(digits: np.ndarray) -> (int, int):
+    """ Part 1 and part 2 answers from an (N, 4) array of decoded digits """
+    part_1_answer = int(np.isin(digits, [1, 4, 7, 8]).sum())
+    part_2_answer = int((digits.astype(np.int64) @ np.array([1000, 100, 10, 1])).sum())
+    return part_1_answer, part_2_answer
+
+
+def bulk_answers(text: str) -> (int, int):
+    """ Answers to part 1 and part 2 for a whole file, decoded in bulk """
+    return answers_from_digits(decode_bitmasks(parse_bitmasks(text)))
+
+
+def chunk_offsets(path: str, chunk_size: int) -> list[(int, int)]:
+    """ Split a file into (start, end) byte ranges of about chunk_size bytes that end on line boundaries """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    offsets = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            end = data.find(b'\n', min(start + chunk_size, size) - 1)
+            end = size if end == -1 else end + 1
+            offsets.append((start, end))
+            start = end
+    return offsets
+
+
+def decode_chunk(path: str, start: int, end: int) -> (int, int):
+    """ Answers to both parts for the entries in bytes start:end of a memory-mapped file """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        chunk = np.frombuffer(data, dtype=np.uint8, count=end - start, offset=start)
+        answers = bulk_answers(chunk)
+        del chunk  # release the buffer before the map is closed
+    return answers
+
+
+def stream_answers(path: str, chunk_size: int = 64 * 2**20, max_workers: int = None) -> (int, int):
+    """
+    Answers to part 1 and part 2 for a display log of any size, memory-mapping the file and decoding it one chunk of
+    lines at a time so memory use is bounded by chunk_size. With max_workers the chunks are decoded in a process
+    pool; each worker maps the file itself, so no entry data is pickled.
+    """
+    offsets = chunk_offsets(path, chunk_size)
+    starts, ends = [start for start, end in offsets], [end for start, end in offsets]
+    if max_workers is None:
+        chunk_answers = map(decode_chunk, [path] * len(offsets), starts, ends)
+        return tuple(map(sum, zip((0, 0), *chunk_answers)))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunk_answers = executor.map(decode_chunk, [path] * len(offsets), starts, ends)
+        return tuple(map(sum, zip((0, 0), *chunk_answers)))
+
+
+class SegmentDisplay:
+    """
+    Decoder for displays with an arbitrary segment alphabet (7-, 14- or 16-segment displays, custom glyph sets).
+
+    The scrambled wiring of an entry is solved by constraint propagation over bitmask domains: every wire starts with
+    the segments of the same frequency (the generalized frequency signature, when all glyphs are shown), each pattern
+    with the glyphs of the same size, and the domains are narrowed until they are consistent. When signatures collide
+    and propagation alone cannot pin the wiring down, the wire with the fewest candidates is branched on.
+
+    :arg glyphs: dict mapping each symbol to the string of segments that are on, e.g. SEGMENTS_IN_DIGITS
+    :arg segments: the segment names, defaults to every segment used by a glyph
+    """
+    def __init__(self, glyphs: dict, segments: str = None):
+        self.segments = sorted(segments or set(''.join(glyphs.values())))
+        self.bits = {segment: 1 << i for i, segment in enumerate(self.segments)}
+        self.all_segments = (1 << len(self.segments)) - 1
+        self.glyph_masks = {symbol: self.mask(pattern) for symbol, pattern in glyphs.items()}
+        self.symbol_of_mask = {mask: symbol for symbol, mask in self.glyph_masks.items()}
+        if len(self.symbol_of_mask) != len(glyphs):
+            raise ValueError('every glyph must light a different set of segments')
+        # precomputed candidate tables
+        self.glyphs_by_size = defaultdict(list)
+        for mask in self.symbol_of_mask:
+            self.glyphs_by_size[bin(mask).count('1')].append(mask)
+        self.segments_by_frequency = defaultdict(int)
+        for i, frequency in enumerate(self.frequencies(self.symbol_of_mask)):
+            self.segments_by_frequency[frequency] |= 1 << i
+
+    def mask(self, pattern: str) -> int:
+        mask = 0
+        for segment in pattern:
+            mask |= self.bits[segment]
+        return mask
+
+    def frequencies(self, masks) -> list[int]:
+        return [sum((mask >> i) & 1 for mask in masks) for i in range(len(self.segments))]
+
+    def solve_wiring(self, scrambled_patterns: list[str]) -> list[int]:
+        """
+        Return the segment index each wire is connected to, solved from the scrambled patterns of one entry.
+        Raises ValueError when no wiring is consistent with the patterns.
+        """
+        masks = [self.mask(pattern) for pattern in scrambled_patterns]
+        if len(set(masks)) == len(self.symbol_of_mask):
+            wire_domains = [self.segments_by_frequency[frequency] for frequency in self.frequencies(masks)]
+        else:  # not every glyph is shown, so the frequencies say nothing
+            wire_domains = [self.all_segments] * len(self.segments)
+        pattern_domains = [list(self.glyphs_by_size[bin(mask).count('1')]) for mask in masks]
+        wiring = self.search(masks, wire_domains, pattern_domains)
+        if wiring is None:
+            raise ValueError(f'no wiring is consistent with the patterns {scrambled_patterns}')
+        return wiring
+
+    def propagate(self, masks, wire_domains, pattern_domains) -> bool:
+        """ Narrow the domains in place until nothing changes, returning False on a contradiction """
+        n_wires = len(wire_domains)
+        changed = True
+        while changed:
+            changed = False
+            # wires that can reach a segment inside / outside of each glyph; the domains only shrink, so these stay
+            # valid (if looser) while the domains are narrowed during the pass
+            reach_inside, reach_outside = {}, {}
+            for glyph in self.symbol_of_mask:
+                reach_inside[glyph] = sum(1 << w for w in range(n_wires) if wire_domains[w] & glyph)
+                reach_outside[glyph] = sum(1 << w for w in range(n_wires) if wire_domains[w] & ~glyph)
+            all_wires = (1 << n_wires) - 1
+            for mask, glyphs in zip(masks, pattern_domains):
+                # a glyph fits if every lit wire can reach one of its segments and every dark wire one outside of it
+                fitting = [glyph for glyph in glyphs
+                           if not mask & ~reach_inside[glyph] and not all_wires & ~mask & ~reach_outside[glyph]]
+                if not fitting:
+                    return False
+                if len(fitting) < len(glyphs):
+                    glyphs[:] = fitting
+                    changed = True
+                lit, dark = 0, 0
+                for glyph in fitting:
+                    lit |= glyph
+                    dark |= self.all_segments & ~glyph
+                for w in range(n_wires):
+                    narrowed = wire_domains[w] & (lit if mask >> w & 1 else dark)
+                    if not narrowed:
+                        return False
+                    if narrowed != wire_domains[w]:
+                        wire_domains[w] = narrowed
+                        changed = True
+            # wires go to different segments and patterns show different glyphs
+            for domains in (wire_domains, pattern_domains):
+                is_wire = domains is wire_domains
+                for i, domain in enumerate(domains):
+                    if (bin(domain).count('1') if is_wire else len(domain)) != 1:
+                        continue
+                    for j in range(len(domains)):
+                        if j == i:
+                            continue
+                        if is_wire and domains[j] & domain:
+                            domains[j] &= ~domain
+                            changed = True
+                            if not domains[j]:
+                                return False
+                        elif not is_wire and domain[0] in domains[j]:
+                            domains[j].remove(domain[0])
+                            changed = True
+                            if not domains[j]:
+                                return False
+        return True
+
+    def search(self, masks, wire_domains, pattern_domains):
+        if not self.propagate(masks, wire_domains, pattern_domains):
+            return None
+        undecided = [w for w, domain in enumerate(wire_domains) if bin(domain).count('1') > 1]
+        if not undecided:
+            return [domain.bit_length() - 1 for domain in wire_domains]
+        wire = min(undecided, key=lambda w: bin(wire_domains[w]).count('1'))
+        domain = wire_domains[wire]
+        while domain:
+            segment = domain & -domain
+            domain ^= segment
+            trial_wire_domains = list(wire_domains)
+            trial_wire_domains[wire] = segment
+            wiring = self.search(masks, trial_wire_domains, [list(glyphs) for glyphs in pattern_domains])
+            if wiring is not None:
+                return wiring
+        return None
+
+    def decode(self, scrambled_patterns: list[str], scrambled_outputs: list[str]) -> list:
+        """ Decode the scrambled outputs of one entry into glyph symbols """
+        wiring = self.solve_wiring(scrambled_patterns)
+        symbols = []
+        for output in scrambled_outputs:
+            mask = self.mask(output)
+            segments = sum(1 << wiring[w] for w in range(len(wiring)) if mask >> w & 1)
+            symbols.append(self.symbol_of_mask[segments])
+        return symbols
+
+
+SEVEN_SEGMENT_DISPLAY = SegmentDisplay(SEGMENTS_IN_DIGITS)
+
+
 if __name__ == '__main__':
     with open('day8_input.txt') as f:
         lines = f.readlines()
@@ -183,7 +482,10 @@ if __name__ == '__main__':
     for signal_patterns, digit_outputs in puzzle_input:
         # print(signal_patterns)
         # print(digit_outputs)
-        decoded_output = determine_digits_in_line(scrambled_signal_patterns=signal_patterns, scrambled_digit_outputs=digit_outputs, decoder=decoder)
+        decoded_output = decode_line(scrambled_signal_patterns=signal_patterns, scrambled_digit_outputs=digit_outputs)
         decoded_outputs.append(decoded_output)
     part_1(decoded_outputs)
-    part_2(decoded_outputs)
\ No newline at end of file
+    part_2(decoded_outputs)
+    assert [SEVEN_SEGMENT_DISPLAY.decode(s.split(), o) for s, o in puzzle_input] == decoded_outputs
+    print(f'answers decoded in bulk: {bulk_answers("".join(lines))}')
+    print(f'answers decoded in streamed chunks: {stream_answers("day8_input.txt", chunk_size=4096, max_workers=2)}')
\ No newline at end of file
@@ -21,19 +21,504 @@ The risk level of a low point is 1 plus its height. In the above example, the ri
 
 Find all of the low points on your heightmap. What is the sum of the risk levels of all low points on your heightmap?
 """
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from collections import Counter, deque
 import numpy as np
-from scipy.signal import argrelmin
-import cv2
-import matplotlib.pyplot as plt
-from skimage.segmentation import watershed
+from visualization import render
+
+
+def find_low_points(heightmap: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of the cells lower than all 4 neighbours, found by comparing the interior of the map with its
+    shifted copies. Cells on the border of the array are never low points (the heightmap is padded with 9s).
+    """
+    low_points = np.zeros(heightmap.shape, dtype=bool)
+    center = heightmap[1:-1, 1:-1]
+    low_points[1:-1, 1:-1] = ((center < heightmap[:-2, 1:-1]) & (center < heightmap[2:, 1:-1])
+                              & (center < heightmap[1:-1, :-2]) & (center < heightmap[1:-1, 2:]))
+    return low_points
+
 
 def create_local_minima_mask(heightmap: np.ndarray) -> np.ndarray:
-    minima_mask = np.ones_like(heightmap)
-    for axis in [0, 1]:
-        temp_minima_mask = np.zeros_like(heightmap)
-        temp_minima_mask[argrelmin(heightmap, axis=axis)] = 1
-        minima_mask = minima_mask * temp_minima_mask
-    return minima_mask
+    return find_low_points(heightmap).astype(heightmap.dtype)
+
+
+def find_roots(parent: np.ndarray) -> np.ndarray:
+    """ Point every node of a union-find forest straight at its root by pointer jumping """
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
+
+
+def union_pairs(parent: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Merge the sets of every pair (a[i], b[i]) in a union-find forest with vectorized rounds: each round hooks the
+    larger root of every unmerged pair onto the smaller one and compresses the forest, until all pairs share a root.
+    Returns the compressed forest, where every node points at the smallest node of its set.
+    """
+    parent = find_roots(parent.copy())
+    while a.size:
+        root_a, root_b = parent[a], parent[b]
+        unmerged = root_a != root_b
+        a, b, root_a, root_b = a[unmerged], b[unmerged], root_a[unmerged], root_b[unmerged]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        parent = find_roots(parent)
+    return parent
+
+
+def label_basins(heightmap: np.ndarray) -> (np.ndarray, int):
+    """
+    Label the basins, the 4-connected regions of cells lower than 9, with a union-find over neighbouring open cells.
+    Returns the label image (0 for the 9s, basins numbered from 1 in row-major order of their first cell) and the
+    number of basins.
+    """
+    open_cells = heightmap != 9
+    index_dtype = np.int32 if heightmap.size < 2**31 else np.int64
+    index = np.arange(heightmap.size, dtype=index_dtype).reshape(heightmap.shape)
+    across = open_cells[:, :-1] & open_cells[:, 1:]
+    down = open_cells[:-1, :] & open_cells[1:, :]
+    a = np.concatenate([index[:, :-1][across], index[:-1, :][down]])
+    b = np.concatenate([index[:, 1:][across], index[1:, :][down]])
+    roots = union_pairs(index.ravel(), a, b)
+    # every root is the first cell of its basin, so numbering the roots in order numbers the basins
+    is_root = (roots == index.ravel()) & open_cells.ravel()
+    n_basins = int(is_root.sum())
+    root_labels = np.cumsum(is_root, dtype=np.min_scalar_type(n_basins))
+    label_image = np.where(open_cells, root_labels[roots].reshape(heightmap.shape), 0)
+    return label_image.astype(root_labels.dtype), n_basins
+
+
+def basin_sizes(heightmap: np.ndarray) -> np.ndarray:
+    """ Number of cells in each basin """
+    basins, n_basins = label_basins(heightmap)
+    return np.bincount(basins.ravel(), minlength=n_basins + 1)[1:]
+
+
+def memmap_heightmap(path: str) -> np.ndarray:
+    """
+    Memory-map a file of digit rows as a (rows, columns) uint8 array of ASCII digits, without reading it. Subtract
+    ord('0') from the tiles that are loaded to get the heights.
+    """
+    with open(path, 'rb') as f:
+        first_line = f.readline()
+    row_stride = len(first_line)
+    n_columns = len(first_line.rstrip(b'\r\n'))
+    data = np.memmap(path, dtype=np.uint8, mode='r') if row_stride else np.zeros(0, dtype=np.uint8)
+    end = len(data)
+    while end and chr(data[end - 1]).isspace():  # trailing line breaks and blank lines
+        end -= 1
+    if not end:
+        return np.zeros((0, n_columns), dtype=np.uint8)
+    terminator = row_stride - n_columns  # the last row may lack its line break
+    if (end + terminator) % row_stride:
+        raise ValueError(f'{path} does not hold rows of {n_columns} digits')
+    n_rows = (end + terminator) // row_stride
+    return np.lib.stride_tricks.as_strided(data[:end], shape=(n_rows, n_columns), strides=(row_stride, 1),
+                                           writeable=False)
+
+
+def find(parent: list[int], node: int) -> int:
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]  # path halving
+        node = parent[node]
+    return node
+
+
+def merge_seam(parent: list[int], before: np.ndarray, after: np.ndarray):
+    """ Union the global labels facing each other across a seam (-1 marks cells of height 9) """
+    both_open = (before >= 0) & (after >= 0)
+    for a, b in np.unique(np.stack([before[both_open], after[both_open]], axis=1), axis=0):
+        root_a, root_b = find(parent, int(a)), find(parent, int(b))
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def sizes_by_root(parent: list[int], sizes: list[int]) -> np.ndarray:
+    """ Add up the sizes of the labels merged into each basin """
+    basin_sizes = Counter()
+    for label, size in enumerate(sizes):
+        basin_sizes[find(parent, label)] += size
+    return np.array(list(basin_sizes.values()), dtype=np.int64)
+
+
+def tiled_basin_sizes(digits: np.ndarray, tile_shape=(1024, 1024)) -> np.ndarray:
+    """
+    Size of every basin of a heightmap that is too large to load, labelling one tile at a time.
+
+    Each tile is loaded, converted from ASCII digits, and labelled with label_basins. Tile labels get global ids, and
+    the labels on either side of each tile seam are merged with a union-find. Only the tile, the labels along the
+    bottom edge of the previous row of tiles and the per-label sizes are kept in memory.
+
+    :arg digits: (rows, columns) array of ASCII digits, e.g. from memmap_heightmap
+    """
+    n_rows, n_columns = digits.shape
+    tile_rows, tile_columns = tile_shape
+    parent, sizes = [], []
+    row_above = np.full(n_columns, -1, dtype=np.int64)  # global labels of the last row of the previous tile row
+    for top in range(0, n_rows, tile_rows):
+        left_column = None
+        for left in range(0, n_columns, tile_columns):
+            heights = np.asarray(digits[top:top + tile_rows, left:left + tile_columns]) - ord('0')
+            labels, n_basins = label_basins(heights)
+            first_id = len(parent)
+            parent.extend(range(first_id, first_id + n_basins))
+            sizes.extend(np.bincount(labels.ravel(), minlength=n_basins + 1)[1:].tolist())
+            global_labels = np.where(labels > 0, labels.astype(np.int64) + first_id - 1, -1)
+
+            # merge across the seams with the tile to the left and the tile above
+            seams = [(row_above[left:left + tile_columns], global_labels[0])]
+            if left_column is not None:
+                seams.append((left_column, global_labels[:, 0]))
+            for before, after in seams:
+                merge_seam(parent, before, after)
+            left_column = global_labels[:, -1]
+            row_above[left:left + tile_columns] = global_labels[-1]
+    return sizes_by_root(parent, sizes)
+
+
+def tiled_top_basins(path: str, k: int = 3, tile_shape=(1024, 1024)) -> list[int]:
+    """ The k largest basin sizes of a memory-mapped heightmap file, largest first """
+    return heapq.nlargest(k, tiled_basin_sizes(memmap_heightmap(path), tile_shape).tolist())
+
+
+def process_band(shared_name: str, shape: (int, int), dtype, top: int, bottom: int):
+    """
+    Low-point risk and basin labels of rows top:bottom of a heightmap in shared memory. The rows just above and below
+    the band are read as a halo, so low points on the band edges see all their neighbours.
+    Returns the risk, the size of each band label and the labels of the first and last row (0 for the 9s).
+    """
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        heightmap = np.ndarray(shape, dtype=dtype, buffer=shared.buf)
+        halo_top = max(top - 1, 0)
+        with_halo = heightmap[halo_top:bottom + 1]
+        band_low_points = find_low_points(with_halo)[top - halo_top:top - halo_top + bottom - top]
+        band = heightmap[top:bottom]
+        risk = int(np.sum(band[band_low_points].astype(np.int64) + 1))
+        labels, n_basins = label_basins(band)
+        sizes = np.bincount(labels.ravel(), minlength=n_basins + 1)[1:]
+        first_row, last_row = labels[0].astype(np.int64), labels[-1].astype(np.int64)
+        del heightmap, with_halo, band  # release the shared buffer before closing it
+    finally:
+        shared.close()
+    return risk, sizes, first_row, last_row
+
+
+def parallel_risk_and_basins(heightmap: np.ndarray, n_bands: int = None, max_workers: int = None) -> (int, np.ndarray):
+    """
+    Sum of the low-point risk levels and the size of every basin, with the heightmap split into row bands that are
+    processed in a process pool. The heightmap is copied once into shared memory and each worker reads its band (plus
+    a one-row halo) from there, so no array is pickled to the workers. Band labels are merged across the band seams
+    with a union-find.
+    """
+    max_workers = max_workers or os.cpu_count()
+    n_bands = min(n_bands or 4 * max_workers, heightmap.shape[0])
+    edges = np.linspace(0, heightmap.shape[0], n_bands + 1).astype(int)
+    shared = shared_memory.SharedMemory(create=True, size=max(heightmap.nbytes, 1))
+    try:
+        np.ndarray(heightmap.shape, dtype=heightmap.dtype, buffer=shared.buf)[:] = heightmap
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            bands = list(executor.map(process_band, [shared.name] * n_bands, [heightmap.shape] * n_bands,
+                                      [heightmap.dtype] * n_bands, edges[:-1], edges[1:]))
+    finally:
+        shared.close()
+        shared.unlink()
+
+    risk, parent, sizes = 0, [], []
+    last_row_above = None
+    for band_risk, band_sizes, first_row, last_row in bands:
+        first_id = len(parent)
+        parent.extend(range(first_id, first_id + len(band_sizes)))
+        sizes.extend(band_sizes.tolist())
+        risk += band_risk
+        first_row, last_row = first_row + first_id - 1, last_row + first_id - 1  # label 0 (the 9s) becomes < 0
+        first_row[first_row < first_id] = -1
+        last_row[last_row < first_id] = -1
+        if last_row_above is not None:
+            merge_seam(parent, last_row_above, first_row)
+        last_row_above = last_row
+    return risk, sizes_by_root(parent, sizes)
+
+
+def heightmap_bands(heightmap: np.ndarray, band_rows: int = 1024):
+    """ Yield consecutive bands of band_rows rows of a heightmap """
+    for top in range(0, heightmap.shape[0], band_rows):
+        yield heightmap[top:top + band_rows]
+
+
+def memmap_bands(path: str, band_rows: int = 1024):
+    """ Yield consecutive bands of heights from a memory-mapped digit file """
+    digits = memmap_heightmap(path)
+    for top in range(0, digits.shape[0], band_rows):
+        yield np.asarray(digits[top:top + band_rows]) - ord('0')
+
+
+def stream_basin_sizes(bands, k: int = 3, histogram: bool = False) -> (list[int], Counter):
+    """
+    The k largest basin sizes (largest first) of a heightmap given as consecutive bands of rows, and optionally a
+    histogram counting the basins of each size.
+
+    A basin is finished as soon as it does not reach the last row labelled so far; its size is then pushed into a
+    heap bounded to k entries (and counted in the histogram) and forgotten. Only the labels along that last row and
+    the sizes of the basins touching it are carried from band to band, so no full label image or list of all basin
+    sizes is ever built.
+    """
+    top_k = []
+    size_histogram = Counter() if histogram else None
+
+    def finish(size):
+        if len(top_k) < k:
+            heapq.heappush(top_k, size)
+        elif k:
+            heapq.heappushpop(top_k, size)
+        if size_histogram is not None:
+            size_histogram[size] += 1
+
+    frontier = None  # basin id of every cell of the last row so far, -1 for 9s
+    open_sizes = {}  # size so far of every basin touching the last row, by id
+    next_id = 0
+    for band in bands:
+        labels, n_basins = label_basins(band)
+        band_sizes = np.bincount(labels.ravel(), minlength=n_basins + 1)[1:].tolist()
+        new_ids = range(next_id, next_id + n_basins)
+        parent = {basin: basin for basin in list(open_sizes) + list(new_ids)}
+        sizes = {**open_sizes, **dict(zip(new_ids, band_sizes))}
+        first_row = np.where(labels[0] > 0, labels[0].astype(np.int64) + next_id - 1, -1)
+        last_row = np.where(labels[-1] > 0, labels[-1].astype(np.int64) + next_id - 1, -1)
+        next_id += n_basins
+
+        if frontier is not None:
+            both_open = (frontier >= 0) & (first_row >= 0)
+            for a, b in set(zip(frontier[both_open].tolist(), first_row[both_open].tolist())):
+                root_a, root_b = find(parent, a), find(parent, b)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+                    sizes[min(root_a, root_b)] += sizes.pop(max(root_a, root_b))
+
+        frontier_roots = {basin: find(parent, basin) for basin in set(last_row[last_row >= 0].tolist())}
+        open_roots = set(frontier_roots.values())
+        open_sizes = {}
+        for root in sizes:
+            if root not in open_roots:
+                finish(sizes[root])
+            else:
+                open_sizes[root] = sizes[root]
+        frontier = np.array([frontier_roots.get(basin, -1) for basin in last_row.tolist()], dtype=np.int64)
+
+    for size in open_sizes.values():
+        finish(size)
+    return sorted(top_k, reverse=True), size_histogram
+
+
+SPLIT_SEARCH_BUDGET = 4096
+
+
+class Heightmap:
+    """
+    A heightmap that keeps its low points, risk sum and basins up to date as single cells are edited.
+
+    An edit only re-checks the low-point status of the cell and its 4 neighbours. Basins are held in a union-find over
+    nodes, one per open cell: a cell dropping below 9 gets a fresh node that is unioned with its open neighbours. A
+    cell rising to 9 leaves its node behind in the tree and first checks, with a search of at most SPLIT_SEARCH_BUDGET
+    cells, whether its open neighbours still reach each other; only when they do not is the basin relabelled, with
+    label_basins over its bounding box, which may split it. Basin sizes are tallied in a histogram, so the largest
+    basins come from the distinct sizes rather than from every basin. Cells outside the array count as 9s.
+    """
+    def __init__(self, heightmap: np.ndarray):
+        self.heights = np.array(heightmap, dtype=np.uint8)
+        self.n_rows, self.n_columns = self.heights.shape
+        padded = np.pad(self.heights, 1, constant_values=9)
+        self.low_points = find_low_points(padded)[1:-1, 1:-1]
+        self.risk_sum = int(np.sum(self.heights[self.low_points].astype(np.int64) + 1))
+
+        labels, n_basins = label_basins(self.heights)
+        labels = labels.ravel()
+        index = np.arange(self.heights.size)
+        first_cell = np.full(n_basins + 1, -1, dtype=np.int64)
+        first_cell[labels[::-1]] = index[::-1]  # the lowest index of each label wins
+        self.node = index.copy()
+        self.n_nodes = self.heights.size
+        self.parent = np.where(labels > 0, first_cell[labels], index)
+        self.size = np.bincount(self.parent, minlength=self.heights.size) * (labels > 0)
+        self.size_counts = Counter(self.size[self.size > 0].tolist())
+        # bounding box (first row, first column, last row, last column) of every basin, held by its root
+        rows, columns = np.divmod(index, self.n_columns)
+        self.box = np.stack([rows, columns, rows, columns], axis=1)
+        open_cells = labels > 0
+        for side, coordinates, bound in ((0, rows, np.minimum), (1, columns, np.minimum),
+                                         (2, rows, np.maximum), (3, columns, np.maximum)):
+            bound.at(self.box[:, side], self.parent[open_cells], coordinates[open_cells])
+        self.history = []
+
+    def neighbours(self, row: int, column: int):
+        for r, c in ((row - 1, column), (row + 1, column), (row, column - 1), (row, column + 1)):
+            if 0 <= r < self.n_rows and 0 <= c < self.n_columns:
+                yield r, c
+
+    def is_low_point(self, row: int, column: int) -> bool:
+        height = self.heights[row, column]
+        return height < 9 and all(height < self.heights[r, c] for r, c in self.neighbours(row, column))
+
+    def set_height(self, row: int, column: int, height: int, record: bool = True):
+        old_height = int(self.heights[row, column])
+        if old_height == height:
+            return
+        if record:
+            self.history.append((row, column, old_height))
+
+        nearby = [(row, column)] + list(self.neighbours(row, column))
+        for r, c in nearby:
+            if self.low_points[r, c]:
+                self.risk_sum -= int(self.heights[r, c]) + 1
+        self.heights[row, column] = height
+        for r, c in nearby:
+            self.low_points[r, c] = self.is_low_point(r, c)
+            if self.low_points[r, c]:
+                self.risk_sum += int(self.heights[r, c]) + 1
+
+        if old_height == 9 and height < 9:
+            self.open_cell(row, column)
+        elif old_height < 9 and height == 9:
+            self.close_cell(row, column)
+
+    def undo(self):
+        """ Roll back the last recorded edit """
+        row, column, height = self.history.pop()
+        self.set_height(row, column, height, record=False)
+
+    def cell(self, row: int, column: int) -> int:
+        return row * self.n_columns + column
+
+    def resize(self, root: int, size: int):
+        """ Move a basin root's size to a new value in the size histogram (0 removes the basin) """
+        for old_or_new, change in ((int(self.size[root]), -1), (size, 1)):
+            if old_or_new:
+                self.size_counts[old_or_new] += change
+                if not self.size_counts[old_or_new]:
+                    del self.size_counts[old_or_new]
+        self.size[root] = size
+
+    def new_node(self, row: int, column: int) -> int:
+        """ Give a reopened cell a node of its own, growing the node arrays when they are full """
+        if self.n_nodes == len(self.parent):
+            extra = len(self.parent)
+            self.parent = np.concatenate([self.parent, np.arange(extra, 2 * extra)])
+            self.size = np.concatenate([self.size, np.zeros(extra, dtype=self.size.dtype)])
+            self.box = np.concatenate([self.box, np.zeros((extra, 4), dtype=self.box.dtype)])
+        node = self.n_nodes
+        self.n_nodes += 1
+        self.parent[node] = node
+        self.size[node] = 0
+        self.box[node] = (row, column, row, column)
+        self.node[self.cell(row, column)] = node
+        return node
+
+    def open_cell(self, row: int, column: int):
+        root = self.new_node(row, column)
+        self.resize(root, 1)
+        for r, c in self.neighbours(row, column):
+            if self.heights[r, c] < 9:
+                other = find(self.parent, self.node[self.cell(r, c)])
+                if other != root:
+                    big, small = (root, other) if self.size[root] >= self.size[other] else (other, root)
+                    merged = int(self.size[root] + self.size[other])
+                    self.resize(small, 0)
+                    self.parent[small] = big
+                    self.resize(big, merged)
+                    self.box[big, :2] = np.minimum(self.box[big, :2], self.box[small, :2])
+                    self.box[big, 2:] = np.maximum(self.box[big, 2:], self.box[small, 2:])
+                    root = big
+
+    def close_cell(self, row: int, column: int):
+        root = find(self.parent, self.node[self.cell(row, column)])
+        starts = [(r, c) for r, c in self.neighbours(row, column) if self.heights[r, c] < 9]
+        # with at most one open neighbour the cell is a dead end of its basin, which cannot split
+        if len(starts) > 1 and not self.still_connected(starts):
+            self.split_basin(root, starts)
+        else:
+            self.resize(root, int(self.size[root]) - 1)
+
+    def still_connected(self, starts: list[(int, int)]) -> bool:
+        """
+        Whether the open cells around a newly closed cell still reach each other. A breadth-first search grows from
+        every start in turn and searches are merged as they meet, so this stops after exploring about as many cells
+        as the shortest detours around the closed cell. It is False when a search runs out of cells before meeting
+        the others, and also when the searches outgrow SPLIT_SEARCH_BUDGET cells without settling.
+        """
+        owner = {start: i for i, start in enumerate(starts)}
+        group = list(range(len(starts)))
+        queues = {i: deque([start]) for i, start in enumerate(starts)}
+
+        def group_of(i):
+            while group[i] != i:
+                i = group[i]
+            return i
+
+        while len(queues) > 1 and len(owner) <= SPLIT_SEARCH_BUDGET:
+            for i in list(queues):
+                if i not in queues:  # merged into another search during this round
+                    continue
+                if not queues[i]:
+                    return False
+                r, c = queues[i].popleft()
+                for neighbour in self.neighbours(r, c):
+                    if self.heights[neighbour] == 9:
+                        continue
+                    other = owner.get(neighbour)
+                    if other is None:
+                        owner[neighbour] = i
+                        queues[i].append(neighbour)
+                    elif group_of(other) != i:
+                        other = group_of(other)
+                        group[other] = i
+                        queues[i].extend(queues.pop(other))
+                        if len(queues) == 1:
+                            return True
+        return len(queues) == 1
+
+    def split_basin(self, root: int, starts: list[(int, int)]):
+        """ Relabel what is left of a basin over its bounding box and give each piece around starts its own root """
+        first_row, first_column, last_row, last_column = (int(bound) for bound in self.box[root])
+        labels, _ = label_basins(self.heights[first_row:last_row + 1, first_column:last_column + 1])
+        self.resize(root, 0)
+        for label in {int(labels[r - first_row, c - first_column]) for r, c in starts}:
+            rows, columns = np.nonzero(labels == label)
+            rows += first_row
+            columns += first_column
+            nodes = self.node[rows * self.n_columns + columns]
+            piece_root = int(nodes.min())
+            self.parent[nodes] = piece_root
+            self.size[nodes] = 0
+            self.box[piece_root] = (rows.min(), columns.min(), rows.max(), columns.max())
+            self.resize(piece_root, len(nodes))
+
+    def basin_size(self, row: int, column: int) -> int:
+        """ Size of the basin containing a cell, 0 for a 9 """
+        if self.heights[row, column] == 9:
+            return 0
+        return int(self.size[find(self.parent, self.node[self.cell(row, column)])])
+
+    def largest_basins(self, k: int = 3) -> list[int]:
+        largest = []
+        for size in sorted(self.size_counts, reverse=True):
+            largest.extend([size] * min(self.size_counts[size], k - len(largest)))
+            if len(largest) == k:
+                break
+        return largest
+
+    @property
+    def n_basins(self) -> int:
+        return sum(self.size_counts.values())
+
+    @property
+    def top_3_product(self) -> int:
+        return int(np.prod(self.largest_basins(3), dtype=object))
+
 
 def part_1(heightmap):
     minima_mask = create_local_minima_mask(heightmap)
@@ -41,34 +526,19 @@ def part_1(heightmap):
     answer = np.sum(minimas + minima_mask)
     print(f'part 1 answer: {answer}')
 
-def part2(heightmap):
-    # visualize the height map
-    plt.figure(0)
-    plt.imshow(heightmap, cmap='gray')
-    plt.title('heightmap')
-
-    # find the local minima to use as markers
+def part2(heightmap, renderer=None):
+    # number the local minima, one marker per basin
     minima_mask = create_local_minima_mask(heightmap)
     markers = minima_mask.ravel().cumsum().reshape(minima_mask.shape) * minima_mask
     markers = np.uint8(markers)
-    plt.figure(1)
-    plt.imshow(markers)
-    plt.title('local minima markers')
-
-    # apply watershed to identify basins
-    basins = watershed(heightmap, markers)
 
-    # set areas of height 9 to not belong to any basin
-    basins[heightmap == 9] = 0
-    print(basins)
-    plt.figure(2)
-    plt.imshow(basins)
-    plt.title(basins)
+    # label the basins: the regions bounded by areas of height 9
+    basins, n_basins = label_basins(heightmap)
 
     # determine area of each basin
-    basin_sizes = np.bincount(basins.ravel())[1:]
-    three_biggest_basins = np.sort(basin_sizes)[-3:]
-    print(f'basin_sizes: {basin_sizes}')
+    sizes = np.bincount(basins.ravel(), minlength=n_basins + 1)[1:]
+    three_biggest_basins = heapq.nlargest(3, sizes.tolist())
+    print(f'number of basins: {n_basins}')
     print(f'three biggest basins: {three_biggest_basins}')
 
     # determine the answer
@@ -76,8 +546,8 @@ def part2(heightmap):
     for x in three_biggest_basins:
         answer = answer * x
     print(f'part 2 answer: {answer}')
-    # show all figures
-    plt.show()
+    # visualize the height map, the local minima markers and the basins
+    render([('heightmap', heightmap), ('local minima markers', markers), ('basins', basins)], renderer)
     return answer
 
 
@@ -88,5 +558,13 @@ if __name__ == '__main__':
     heightmap = np.pad(heightmap, pad_width=(1,), mode='constant', constant_values=9)
     heightmap = np.uint8(heightmap)
     part_1(heightmap)
-    part2(heightmap)
+    part2(heightmap, renderer=os.environ.get('AOC_RENDERER', 'matplotlib'))
+    risk, sizes = parallel_risk_and_basins(heightmap)
+    print(f'part 1 and three biggest basins in parallel bands: {risk}, {heapq.nlargest(3, sizes.tolist())}')
+    print(f'three biggest basins, labelled out of core: {tiled_top_basins("day9_input.txt", tile_shape=(32, 32))}')
+    editable = Heightmap(heightmap[1:-1, 1:-1])
+    editable.set_height(0, 0, 9)
+    editable.undo()
+    print(f'incremental heightmap: risk sum {editable.risk_sum}, top 3 product {editable.top_3_product}')
+    print(f'three biggest basins, streamed: {stream_basin_sizes(memmap_bands("day9_input.txt", band_rows=16))[0]}')
 
@@ -0,0 +1,90 @@
+"""
+Rendering of 2d arrays (vent fields, heightmaps, basins) for the day scripts.
+
+matplotlib is only imported when the 'matplotlib' renderer is actually used. The 'pgm' and 'png' renderers write 8-bit
+grayscale images straight from the array buffer, so batch runs can dump images without matplotlib installed. The
+'none' renderer skips rendering altogether.
+"""
+import os
+import re
+import struct
+import zlib
+import numpy as np
+
+DEFAULT_RENDERER = 'none'
+
+
+def to_gray(image: np.ndarray) -> np.ndarray:
+    """ Scale an array to uint8 grayscale, mapping 0 (or its minimum, when negative) to 0 and its maximum to 255 """
+    image = np.asarray(image, dtype=np.float64)
+    if image.size and image.min() < 0:
+        image = image - image.min()
+    peak = image.max() if image.size else 0
+    if peak > 0:
+        image = image * (255 / peak)
+    return np.ascontiguousarray(image, dtype=np.uint8)
+
+
+def image_path(title: str, output_dir: str, extension: str) -> str:
+    name = re.sub(r'[^A-Za-z0-9_-]+', '_', title).strip('_') or 'image'
+    return os.path.join(output_dir, f'{name}.{extension}')
+
+
+def write_pgm(image: np.ndarray, path: str):
+    gray = to_gray(image)
+    with open(path, 'wb') as f:
+        f.write(f'P5\n{gray.shape[1]} {gray.shape[0]}\n255\n'.encode('ascii'))
+        f.write(gray.tobytes())
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+def write_png(image: np.ndarray, path: str):
+    gray = to_gray(image)
+    height, width = gray.shape
+    # every scanline starts with filter type 0 (no filtering)
+    scanlines = np.hstack([np.zeros((height, 1), dtype=np.uint8), gray])
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)  # 8-bit grayscale
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(png_chunk(b'IHDR', header))
+        f.write(png_chunk(b'IDAT', zlib.compress(scanlines.tobytes())))
+        f.write(png_chunk(b'IEND', b''))
+
+
+def render_matplotlib(images: list[(str, np.ndarray)], output_dir: str):
+    import matplotlib.pyplot as plt
+    for i, (title, image) in enumerate(images):
+        plt.figure(i)
+        plt.imshow(image)
+        plt.title(title)
+    plt.show()
+
+
+def render_files(writer, extension):
+    def render(images: list[(str, np.ndarray)], output_dir: str):
+        for title, image in images:
+            writer(image, image_path(title, output_dir, extension))
+    return render
+
+
+RENDERERS = {'none': lambda images, output_dir: None,
+             'matplotlib': render_matplotlib,
+             'pgm': render_files(write_pgm, 'pgm'),
+             'png': render_files(write_png, 'png'),
+             }
+
+
+def render(images: list[(str, np.ndarray)], renderer: str = None, output_dir: str = '.'):
+    """
+    Render a list of (title, image) pairs.
+
+    :arg renderer: one of RENDERERS, defaults to DEFAULT_RENDERER
+    :arg output_dir: directory the file renderers write <title>.pgm / <title>.png into
+    """
+    renderer = renderer or DEFAULT_RENDERER
+    if renderer not in RENDERERS:
+        raise ValueError(f'unknown renderer {renderer!r}, expected one of {sorted(RENDERERS)}')
+    RENDERERS[renderer](images, output_dir)